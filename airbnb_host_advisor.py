@@ -4,14 +4,14 @@ Airbnb Host Dashboard - Analytics and Market Insights
 """
 
 import streamlit as st
-import pandas as pd
 import plotly.express as px
+import plotly.graph_objects as go
 from streamlit_calendar import calendar
 
 # Import our modules
-from utils.data_loader import load_booking_data, load_city_data
-from analytics.analysis import analyze_occupancy, analyze_revenue, analyze_pricing, analyze_city_market, analyze_review_patterns, analyze_copenhagen_occupancy, analyze_enhanced_review_patterns
-from components.ui import get_custom_css, render_success_message, render_error_message, render_upload_instructions, render_dashboard_features
+from utils.data_loader import load_booking_data, load_city_data, load_full_calendar_data, load_calendar_daily_counts, count_calendar_days
+from analytics.analysis import analyze_occupancy, analyze_revenue, analyze_pricing, analyze_city_market, analyze_review_patterns, analyze_copenhagen_occupancy, analyze_enhanced_review_patterns, create_calendar_events, summarize_calendar_events
+from components.ui import get_custom_css, render_success_message, render_error_message, render_upload_instructions, render_dashboard_features, build_viridis_bar_chart, render_metric_row
 
 # Page configuration
 st.set_page_config(
@@ -28,26 +28,27 @@ st.markdown(get_custom_css(), unsafe_allow_html=True)
 def render_data_analysis_page(df, uploaded_files, date_cols, price_cols):
     """Render the main data analysis page"""
     if not uploaded_files:
-        st.markdown("### 📁 Upload Your Airbnb Data")
-        st.markdown("Upload one or more CSV exports of your Airbnb bookings. The app will automatically detect date and price columns.")
+        st.markdown("### 📁 Upload Your Airbnb Data\n\nUpload one or more CSV exports of your Airbnb bookings. The app will automatically detect date and price columns.")
         render_upload_instructions()
         return
     
     if df is not None and len(df) > 0:
         st.markdown(f'<div class="success-message">✅ Successfully loaded {len(uploaded_files)} file(s) with {len(df)} total bookings!</div>', unsafe_allow_html=True)
         
-        # Show data preview
-        st.markdown("### 📊 Data Preview")
-        st.write(f"**Files uploaded:** {len(uploaded_files)}")
-        st.write(f"**Total bookings:** {len(df)}")
-        st.write(f"**Date columns found:** {date_cols}")
-        st.write(f"**Price columns found:** {price_cols}")
+        # Show data preview - assembled into one markdown element rather than one per line
+        preview_lines = [
+            "### 📊 Data Preview",
+            f"**Files uploaded:** {len(uploaded_files)}",
+            f"**Total bookings:** {len(df)}",
+            f"**Date columns found:** {date_cols}",
+            f"**Price columns found:** {price_cols}"
+        ]
         
         # Show file names
         if len(uploaded_files) > 1:
-            st.write("**Files processed:**")
-            for i, file in enumerate(uploaded_files, 1):
-                st.write(f"  {i}. {file.name}")
+            preview_lines.append("**Files processed:**")
+            preview_lines.append("\n".join(f"{i}. {file.name}" for i, file in enumerate(uploaded_files, 1)))
+        st.markdown("\n\n".join(preview_lines))
         
         # Data preview
         st.dataframe(df.head(), use_container_width=True)
@@ -72,23 +73,12 @@ def render_occupancy_analysis_page(df, date_cols, uploaded_files):
     
     occupancy_data = analyze_occupancy(df, date_cols)
     if occupancy_data:
-        col1, col2, col3 = st.columns(3)
-        
-        with col1:
-            st.markdown('<div class="metric-card">', unsafe_allow_html=True)
-            st.metric("Total Bookings", f"{occupancy_data['total_bookings']:,}")
-            st.markdown('</div>', unsafe_allow_html=True)
-        
-        with col2:
-            st.markdown('<div class="metric-card">', unsafe_allow_html=True)
-            st.metric("Unique Dates", f"{occupancy_data['unique_dates']:,}")
-            st.markdown('</div>', unsafe_allow_html=True)
-        
-        with col3:
-            avg_bookings_per_date = occupancy_data['total_bookings'] / occupancy_data['unique_dates']
-            st.markdown('<div class="metric-card">', unsafe_allow_html=True)
-            st.metric("Avg Bookings/Day", f"{avg_bookings_per_date:.1f}")
-            st.markdown('</div>', unsafe_allow_html=True)
+        avg_bookings_per_date = occupancy_data['total_bookings'] / occupancy_data['unique_dates']
+        render_metric_row([
+            ("Total Bookings", f"{occupancy_data['total_bookings']:,}"),
+            ("Unique Dates", f"{occupancy_data['unique_dates']:,}"),
+            ("Avg Bookings/Day", f"{avg_bookings_per_date:.1f}")
+        ])
         
         # Monthly occupancy chart
         if not occupancy_data['monthly_occupancy'].empty:
@@ -118,22 +108,11 @@ def render_revenue_analysis_page(df, price_cols, uploaded_files):
     
     revenue_data = analyze_revenue(df, price_cols)
     if revenue_data:
-        col1, col2, col3 = st.columns(3)
-        
-        with col1:
-            st.markdown('<div class="metric-card">', unsafe_allow_html=True)
-            st.metric("Total Revenue", f"${revenue_data['total_revenue']:,.0f}")
-            st.markdown('</div>', unsafe_allow_html=True)
-        
-        with col2:
-            st.markdown('<div class="metric-card">', unsafe_allow_html=True)
-            st.metric("Avg Revenue/Booking", f"${revenue_data['avg_revenue_per_booking']:.0f}")
-            st.markdown('</div>', unsafe_allow_html=True)
-        
-        with col3:
-            st.markdown('<div class="metric-card">', unsafe_allow_html=True)
-            st.metric("Total Bookings", f"{len(df):,}")
-            st.markdown('</div>', unsafe_allow_html=True)
+        render_metric_row([
+            ("Total Revenue", f"${revenue_data['total_revenue']:,.0f}"),
+            ("Avg Revenue/Booking", f"${revenue_data['avg_revenue_per_booking']:.0f}"),
+            ("Total Bookings", f"{len(df):,}")
+        ])
         
         # Monthly revenue chart
         if not revenue_data['revenue_by_month'].empty:
@@ -156,22 +135,11 @@ def render_pricing_analysis_page(df, date_cols, price_cols, uploaded_files):
     
     pricing_data = analyze_pricing(df, price_cols, date_cols)
     if pricing_data:
-        col1, col2, col3 = st.columns(3)
-        
-        with col1:
-            st.markdown('<div class="metric-card">', unsafe_allow_html=True)
-            st.metric("Average Price", f"${pricing_data['avg_price']:.0f}")
-            st.markdown('</div>', unsafe_allow_html=True)
-        
-        with col2:
-            st.markdown('<div class="metric-card">', unsafe_allow_html=True)
-            st.metric("Median Price", f"${pricing_data['median_price']:.0f}")
-            st.markdown('</div>', unsafe_allow_html=True)
-        
-        with col3:
-            st.markdown('<div class="metric-card">', unsafe_allow_html=True)
-            st.metric("Total Bookings", f"{len(df):,}")
-            st.markdown('</div>', unsafe_allow_html=True)
+        render_metric_row([
+            ("Average Price", f"${pricing_data['avg_price']:.0f}"),
+            ("Median Price", f"${pricing_data['median_price']:.0f}"),
+            ("Total Bookings", f"{len(df):,}")
+        ])
         
         # Price trend chart
         if not pricing_data['price_trend'].empty:
@@ -197,8 +165,7 @@ def render_city_market_page(listings_df, calendar_df, city_data_loaded):
         """, unsafe_allow_html=True)
         return
     
-    st.markdown("### 🏙️ Copenhagen Market Insights")
-    st.markdown("Explore market statistics and trends for Copenhagen to understand the competitive landscape.")
+    st.markdown("### 🏙️ Copenhagen Market Insights\n\nExplore market statistics and trends for Copenhagen to understand the competitive landscape.")
     
     # Analyze city market
     city_stats = analyze_city_market(listings_df, calendar_df)
@@ -207,63 +174,37 @@ def render_city_market_page(listings_df, calendar_df, city_data_loaded):
         # Market overview
         st.markdown("### 📊 Market Overview")
         
-        col1, col2, col3, col4 = st.columns(4)
-        
-        with col1:
-            st.markdown('<div class="metric-card">', unsafe_allow_html=True)
-            st.metric("Total Listings", f"{city_stats['total_listings']:,}")
-            st.markdown('</div>', unsafe_allow_html=True)
-        
-        with col2:
-            st.markdown('<div class="metric-card">', unsafe_allow_html=True)
-            st.metric("Neighbourhoods", f"{city_stats['neighbourhoods']}")
-            st.markdown('</div>', unsafe_allow_html=True)
+        if city_stats['calendar_analysis'] and 'basic_stats' in city_stats['calendar_analysis']:
+            occupancy_rate = f"{city_stats['calendar_analysis']['basic_stats']['occupancy_rate']:.1f}%"
+        else:
+            occupancy_rate = "N/A"
         
-        with col3:
-            st.markdown('<div class="metric-card">', unsafe_allow_html=True)
-            st.metric("Room Types", f"{city_stats['room_types']}")
-            st.markdown('</div>', unsafe_allow_html=True)
-        
-        with col4:
-            if city_stats['calendar_analysis'] and 'basic_stats' in city_stats['calendar_analysis']:
-                st.markdown('<div class="metric-card">', unsafe_allow_html=True)
-                st.metric("Occupancy Rate", f"{city_stats['calendar_analysis']['basic_stats']['occupancy_rate']:.1f}%")
-                st.markdown('</div>', unsafe_allow_html=True)
-            else:
-                st.markdown('<div class="metric-card">', unsafe_allow_html=True)
-                st.metric("Occupancy Rate", "N/A")
-                st.markdown('</div>', unsafe_allow_html=True)
+        render_metric_row([
+            ("Total Listings", f"{city_stats['total_listings']:,}"),
+            ("Neighbourhoods", f"{city_stats['neighbourhoods']}"),
+            ("Room Types", f"{city_stats['room_types']}"),
+            ("Occupancy Rate", occupancy_rate)
+        ])
         
         # Price analysis
         if city_stats['price_stats']:
             st.markdown("### 💰 Market Pricing")
             
-            col1, col2, col3, col4 = st.columns(4)
-            
-            with col1:
-                st.markdown('<div class="metric-card">', unsafe_allow_html=True)
-                st.metric("Average Price", f"${city_stats['price_stats']['avg_price']:.0f}")
-                st.markdown('</div>', unsafe_allow_html=True)
-            
-            with col2:
-                st.markdown('<div class="metric-card">', unsafe_allow_html=True)
-                st.metric("Median Price", f"${city_stats['price_stats']['median_price']:.0f}")
-                st.markdown('</div>', unsafe_allow_html=True)
-            
-            with col3:
-                st.markdown('<div class="metric-card">', unsafe_allow_html=True)
-                st.metric("Min Price", f"${city_stats['price_stats']['min_price']:.0f}")
-                st.markdown('</div>', unsafe_allow_html=True)
-            
-            with col4:
-                st.markdown('<div class="metric-card">', unsafe_allow_html=True)
-                st.metric("Max Price", f"${city_stats['price_stats']['max_price']:.0f}")
-                st.markdown('</div>', unsafe_allow_html=True)
+            render_metric_row([
+                ("Average Price", f"${city_stats['price_stats']['avg_price']:.0f}"),
+                ("Median Price", f"${city_stats['price_stats']['median_price']:.0f}"),
+                ("Min Price", f"${city_stats['price_stats']['min_price']:.0f}"),
+                ("Max Price", f"${city_stats['price_stats']['max_price']:.0f}")
+            ])
             
             # Price distribution
-            fig = px.histogram(x=city_stats['price_stats']['price_distribution'], nbins=30,
-                             title="Copenhagen Price Distribution",
-                             labels={'x': 'Price ($)', 'y': 'Number of Listings'})
+            counts, edges = city_stats['price_stats']['price_histogram']
+            fig = go.Figure(go.Bar(x=(edges[:-1] + edges[1:]) / 2, y=counts, width=edges[1:] - edges[:-1]))
+            fig.update_layout(
+                title="Copenhagen Price Distribution",
+                xaxis_title='Price ($)',
+                yaxis_title='Number of Listings'
+            )
             st.plotly_chart(fig, use_container_width=True)
         
         # Neighbourhood analysis
@@ -317,45 +258,26 @@ def render_review_analysis_page(reviews_df, listings_df, city_data_loaded):
         st.error("❌ Copenhagen market data not available. Please ensure the data files are in the project directory.")
         return
     
-    st.markdown("### 📝 Enhanced Review Analysis")
-    st.markdown("Analyzing review patterns and listing review metrics to understand guest feedback trends.")
+    st.markdown("### 📝 Enhanced Review Analysis\n\nAnalyzing review patterns and listing review metrics to understand guest feedback trends.")
     
     review_data = analyze_enhanced_review_patterns(reviews_df, listings_df)
     
     if review_data:
         # Review statistics
-        col1, col2, col3 = st.columns(3)
-        
-        with col1:
-            st.markdown('<div class="metric-card">', unsafe_allow_html=True)
-            st.metric("Total Reviews", f"{review_data['total_reviews']:,}")
-            st.markdown('</div>', unsafe_allow_html=True)
-        
-        with col2:
-            st.markdown('<div class="metric-card">', unsafe_allow_html=True)
-            st.metric("Avg Reviews/Day", f"{review_data['avg_reviews_per_day']:.1f}")
-            st.markdown('</div>', unsafe_allow_html=True)
-        
-        with col3:
-            # Find the day with most reviews
-            most_reviews_day = review_data['reviews_by_day'].idxmax()
-            most_reviews_count = review_data['reviews_by_day'].max()
-            st.markdown('<div class="metric-card">', unsafe_allow_html=True)
-            st.metric("Peak Review Day", f"{most_reviews_day}")
-            st.markdown('</div>', unsafe_allow_html=True)
+        # Find the day with most reviews
+        most_reviews_day = review_data['reviews_by_day'].idxmax()
+        render_metric_row([
+            ("Total Reviews", f"{review_data['total_reviews']:,}"),
+            ("Avg Reviews/Day", f"{review_data['avg_reviews_per_day']:.1f}"),
+            ("Peak Review Day", f"{most_reviews_day}")
+        ])
         
         # Reviews by day of week chart
         st.markdown("#### 📊 Reviews by Day of Week")
         
         # Create the chart
-        fig = px.bar(
-            x=review_data['reviews_by_day'].index,
-            y=review_data['reviews_by_day'].values,
-            title="Number of Reviews by Day of Week",
-            labels={'x': 'Day of Week', 'y': 'Number of Reviews'},
-            color=review_data['reviews_by_day'].values,
-            color_continuous_scale='viridis'
-        )
+        fig = build_viridis_bar_chart(review_data['reviews_by_day'], "Number of Reviews by Day of Week",
+                                      'Day of Week', 'Number of Reviews')
         
         # Update layout for better presentation
         fig.update_layout(
@@ -404,8 +326,7 @@ def render_review_analysis_page(reviews_df, listings_df, city_data_loaded):
         
         # Enhanced Review Analysis - New Features from Listings Data
         if 'review_stats' in review_data and review_data['review_stats']:
-            st.markdown("### 📊 Enhanced Review Metrics Analysis")
-            st.markdown("Analysis of review-related features from listings data to understand review patterns and distribution.")
+            st.markdown("### 📊 Enhanced Review Metrics Analysis\n\nAnalysis of review-related features from listings data to understand review patterns and distribution.")
             
             # Review statistics overview
             st.markdown("#### 📈 Review Statistics Overview")
@@ -421,39 +342,22 @@ def render_review_analysis_page(reviews_df, listings_df, city_data_loaded):
                 for i, feature in enumerate(available_features):
                     with cols[i % 4]:
                         stats = review_stats[feature]
-                        st.markdown(f'<div class="metric-card">', unsafe_allow_html=True)
                         st.metric(
                             f"{feature.replace('_', ' ').title()}",
                             f"{stats['mean']:.1f}",
                             help=f"Mean: {stats['mean']:.1f}, Median: {stats['median']:.1f}, Std: {stats['std']:.1f}"
                         )
-                        st.markdown('</div>', unsafe_allow_html=True)
                 
                 # Zero reviews analysis
                 st.markdown("#### 🔍 Zero Reviews Analysis")
-                col1, col2, col3 = st.columns(3)
-                
-                with col1:
-                    if 'number_of_reviews' in review_stats:
-                        stats = review_stats['number_of_reviews']
-                        st.markdown('<div class="metric-card">', unsafe_allow_html=True)
-                        st.metric("Listings with 0 Reviews", f"{stats['zero_reviews']:,}")
-                        st.markdown('</div>', unsafe_allow_html=True)
-                
-                with col2:
-                    if 'number_of_reviews' in review_stats:
-                        stats = review_stats['number_of_reviews']
-                        st.markdown('<div class="metric-card">', unsafe_allow_html=True)
-                        st.metric("0 Reviews %", f"{stats['zero_reviews_pct']:.1f}%")
-                        st.markdown('</div>', unsafe_allow_html=True)
-                
-                with col3:
-                    if 'number_of_reviews' in review_stats:
-                        stats = review_stats['number_of_reviews']
-                        active_listings = stats['total_listings'] - stats['zero_reviews']
-                        st.markdown('<div class="metric-card">', unsafe_allow_html=True)
-                        st.metric("Active Listings", f"{active_listings:,}")
-                        st.markdown('</div>', unsafe_allow_html=True)
+                if 'number_of_reviews' in review_stats:
+                    stats = review_stats['number_of_reviews']
+                    active_listings = stats['total_listings'] - stats['zero_reviews']
+                    render_metric_row([
+                        ("Listings with 0 Reviews", f"{stats['zero_reviews']:,}"),
+                        ("0 Reviews %", f"{stats['zero_reviews_pct']:.1f}%"),
+                        ("Active Listings", f"{active_listings:,}")
+                    ])
                 
                 # Distribution plots for review features
                 if 'review_distributions' in review_data and review_data['review_distributions']:
@@ -464,14 +368,8 @@ def render_review_analysis_page(reviews_df, listings_df, city_data_loaded):
                     # Create distribution charts
                     for feature, distribution in distributions.items():
                         if not distribution.empty:
-                            fig = px.bar(
-                                x=distribution.index,
-                                y=distribution.values,
-                                title=f"{feature.replace('_', ' ').title()} Distribution",
-                                labels={'x': 'Range', 'y': 'Number of Listings'},
-                                color=distribution.values,
-                                color_continuous_scale='viridis'
-                            )
+                            fig = build_viridis_bar_chart(distribution, f"{feature.replace('_', ' ').title()} Distribution",
+                                                          'Range', 'Number of Listings')
                             st.plotly_chart(fig, use_container_width=True)
                 
 
@@ -485,14 +383,8 @@ def render_review_analysis_page(reviews_df, listings_df, city_data_loaded):
                     for feature, room_stats in room_type_data.items():
                         if not room_stats.empty:
                             # Create bar chart for mean values
-                            fig = px.bar(
-                                x=room_stats.index,
-                                y=room_stats['mean'],
-                                title=f"Average {feature.replace('_', ' ').title()} by Room Type",
-                                labels={'x': 'Room Type', 'y': f'Average {feature.replace("_", " ").title()}'},
-                                color=room_stats['mean'],
-                                color_continuous_scale='viridis'
-                            )
+                            fig = build_viridis_bar_chart(room_stats['mean'], f"Average {feature.replace('_', ' ').title()} by Room Type",
+                                                          'Room Type', f'Average {feature.replace("_", " ").title()}')
                             st.plotly_chart(fig, use_container_width=True)
                             
                             # Display detailed table
@@ -510,14 +402,8 @@ def render_review_analysis_page(reviews_df, listings_df, city_data_loaded):
                             # Create bar chart for mean values (top 10)
                             top_neighbourhoods = neighbourhood_stats.sort_values('mean', ascending=False).head(10)
                             
-                            fig = px.bar(
-                                x=top_neighbourhoods.index,
-                                y=top_neighbourhoods['mean'],
-                                title=f"Top 10 Neighbourhoods by Average {feature.replace('_', ' ').title()}",
-                                labels={'x': 'Neighbourhood', 'y': f'Average {feature.replace("_", " ").title()}'},
-                                color=top_neighbourhoods['mean'],
-                                color_continuous_scale='viridis'
-                            )
+                            fig = build_viridis_bar_chart(top_neighbourhoods['mean'], f"Top 10 Neighbourhoods by Average {feature.replace('_', ' ').title()}",
+                                                          'Neighbourhood', f'Average {feature.replace("_", " ").title()}')
                             st.plotly_chart(fig, use_container_width=True)
                             
                             # Display detailed table
@@ -574,49 +460,33 @@ def render_copenhagen_occupancy_page(calendar_df, listings_df, city_data_loaded)
         st.error("❌ Copenhagen market data not available. Please ensure the data files are in the project directory.")
         return
     
-    st.markdown("### 📊 Copenhagen Market Occupancy Analysis")
-    st.markdown("Analyze which days have more bookings and which have fewer in the Copenhagen market.")
+    st.markdown("### 📊 Copenhagen Market Occupancy Analysis\n\nAnalyze which days have more bookings and which have fewer in the Copenhagen market.")
     
-    # Load full calendar data for comprehensive analysis
+    # Stream the full calendar into per-date occupancy counts for comprehensive analysis
     with st.spinner("Loading Copenhagen occupancy data..."):
-        from utils.data_loader import load_full_calendar_data
-        full_calendar_df = load_full_calendar_data()
+        daily_counts = load_calendar_daily_counts()
         
-        if full_calendar_df is not None:
-            calendar_df = full_calendar_df
+        if daily_counts is None and calendar_df is not None and not calendar_df.empty:
+            # Fallback to sample data
+            daily_counts = count_calendar_days(calendar_df)
     
-    if calendar_df is None or calendar_df.empty:
+    if daily_counts is None or daily_counts.empty:
         st.error("❌ No calendar data available for occupancy analysis.")
         return
     
     # Analyze Copenhagen occupancy with listings data for availability_365 analysis
-    occupancy_data = analyze_copenhagen_occupancy(calendar_df, listings_df)
+    occupancy_data = analyze_copenhagen_occupancy(daily_counts, listings_df)
     
     if occupancy_data:
         # Overview metrics
         st.markdown("### 📈 Market Overview")
         
-        col1, col2, col3, col4 = st.columns(4)
-        
-        with col1:
-            st.markdown('<div class="metric-card">', unsafe_allow_html=True)
-            st.metric("Total Days Analyzed", f"{occupancy_data['total_days']:,}")
-            st.markdown('</div>', unsafe_allow_html=True)
-        
-        with col2:
-            st.markdown('<div class="metric-card">', unsafe_allow_html=True)
-            st.metric("Booked Days", f"{occupancy_data['booked_days']:,}")
-            st.markdown('</div>', unsafe_allow_html=True)
-        
-        with col3:
-            st.markdown('<div class="metric-card">', unsafe_allow_html=True)
-            st.metric("Available Days", f"{occupancy_data['available_days']:,}")
-            st.markdown('</div>', unsafe_allow_html=True)
-        
-        with col4:
-            st.markdown('<div class="metric-card">', unsafe_allow_html=True)
-            st.metric("Occupancy Rate", f"{occupancy_data['occupancy_rate']:.1f}%")
-            st.markdown('</div>', unsafe_allow_html=True)
+        render_metric_row([
+            ("Total Days Analyzed", f"{occupancy_data['total_days']:,}"),
+            ("Booked Days", f"{occupancy_data['booked_days']:,}"),
+            ("Available Days", f"{occupancy_data['available_days']:,}"),
+            ("Occupancy Rate", f"{occupancy_data['occupancy_rate']:.1f}%")
+        ])
         
         # Peak and low occupancy insights
         st.markdown("### 🎯 Peak & Low Occupancy Days")
@@ -624,61 +494,41 @@ def render_copenhagen_occupancy_page(calendar_df, listings_df, city_data_loaded)
         col1, col2 = st.columns(2)
         
         with col1:
-            st.markdown('<div class="insight-box">', unsafe_allow_html=True)
             st.markdown(f"""
-            <h4>📈 Peak Occupancy Day</h4>
-            <p><strong>{occupancy_data['peak_day']}</strong> with {occupancy_data['peak_bookings']:,} bookings</p>
+            <div class="insight-box">
+                <h4>📈 Peak Occupancy Day</h4>
+                <p><strong>{occupancy_data['peak_day']}</strong> with {occupancy_data['peak_bookings']:,} bookings</p>
+            </div>
             """, unsafe_allow_html=True)
-            st.markdown('</div>', unsafe_allow_html=True)
         
         with col2:
-            st.markdown('<div class="insight-box">', unsafe_allow_html=True)
             st.markdown(f"""
-            <h4>📉 Lowest Occupancy Day</h4>
-            <p><strong>{occupancy_data['low_day']}</strong> with {occupancy_data['low_bookings']:,} bookings</p>
+            <div class="insight-box">
+                <h4>📉 Lowest Occupancy Day</h4>
+                <p><strong>{occupancy_data['low_day']}</strong> with {occupancy_data['low_bookings']:,} bookings</p>
+            </div>
             """, unsafe_allow_html=True)
-            st.markdown('</div>', unsafe_allow_html=True)
         
         # Weekend vs Weekday analysis
         st.markdown("### 📅 Weekend vs Weekday Analysis")
         
-        col1, col2 = st.columns(2)
-        
-        with col1:
-            st.markdown('<div class="metric-card">', unsafe_allow_html=True)
-            st.metric("Weekend Bookings", f"{occupancy_data['weekend_bookings']:,}")
-            st.markdown('</div>', unsafe_allow_html=True)
-        
-        with col2:
-            st.markdown('<div class="metric-card">', unsafe_allow_html=True)
-            st.metric("Weekday Bookings", f"{occupancy_data['weekday_bookings']:,}")
-            st.markdown('</div>', unsafe_allow_html=True)
+        render_metric_row([
+            ("Weekend Bookings", f"{occupancy_data['weekend_bookings']:,}"),
+            ("Weekday Bookings", f"{occupancy_data['weekday_bookings']:,}")
+        ])
         
         # Weekend vs Weekday percentage
-        col1, col2 = st.columns(2)
-        
-        with col1:
-            st.markdown('<div class="metric-card">', unsafe_allow_html=True)
-            st.metric("Weekend %", f"{occupancy_data['weekend_pct']:.1f}%")
-            st.markdown('</div>', unsafe_allow_html=True)
-        
-        with col2:
-            st.markdown('<div class="metric-card">', unsafe_allow_html=True)
-            st.metric("Weekday %", f"{occupancy_data['weekday_pct']:.1f}%")
-            st.markdown('</div>', unsafe_allow_html=True)
+        render_metric_row([
+            ("Weekend %", f"{occupancy_data['weekend_pct']:.1f}%"),
+            ("Weekday %", f"{occupancy_data['weekday_pct']:.1f}%")
+        ])
         
         # Day of week occupancy chart
         st.markdown("### 📊 Occupancy by Day of Week")
         
         if not occupancy_data['dow_occupancy'].empty:
-            fig = px.bar(
-                x=occupancy_data['dow_occupancy'].index,
-                y=occupancy_data['dow_occupancy'].values,
-                title="Copenhagen Market: Bookings by Day of Week",
-                labels={'x': 'Day of Week', 'y': 'Number of Bookings'},
-                color=occupancy_data['dow_occupancy'].values,
-                color_continuous_scale='viridis'
-            )
+            fig = build_viridis_bar_chart(occupancy_data['dow_occupancy'], "Copenhagen Market: Bookings by Day of Week",
+                                          'Day of Week', 'Number of Bookings')
             
             # Update layout for better presentation
             fig.update_layout(
@@ -752,46 +602,29 @@ def render_copenhagen_occupancy_page(calendar_df, listings_df, city_data_loaded)
         else:
             insights.append(f"📊 **Moderate occupancy market** with {occupancy_data['occupancy_rate']:.1f}% overall occupancy rate")
         
-        # Display insights
-        for insight in insights:
-            st.markdown(f"""
+        # Display insights - every box goes out in a single markdown element
+        st.markdown("".join(f"""
             <div class="insight-box">
                 <p>{insight}</p>
             </div>
-            """, unsafe_allow_html=True)
+            """ for insight in insights), unsafe_allow_html=True)
         
         # Enhanced analysis with availability_365
         if occupancy_data.get('availability_analysis'):
-            st.markdown("### 🏠 Availability 365 Analysis")
-            st.markdown("Analysis of listing availability patterns for the next 365 days.")
+            st.markdown("### 🏠 Availability 365 Analysis\n\nAnalysis of listing availability patterns for the next 365 days.")
             
             availability_data = occupancy_data['availability_analysis']
             
             # Overview metrics
             st.markdown("#### 📊 Availability Overview")
             
-            col1, col2, col3, col4 = st.columns(4)
-            
-            with col1:
-                st.markdown('<div class="metric-card">', unsafe_allow_html=True)
-                st.metric("Total Listings", f"{availability_data['total_listings']:,}")
-                st.markdown('</div>', unsafe_allow_html=True)
-            
-            with col2:
-                st.markdown('<div class="metric-card">', unsafe_allow_html=True)
-                st.metric("High Availability", f"{availability_data['high_availability_count']:,}")
-                st.markdown('</div>', unsafe_allow_html=True)
-            
-            with col3:
-                st.markdown('<div class="metric-card">', unsafe_allow_html=True)
-                st.metric("Low Availability", f"{availability_data['low_availability_count']:,}")
-                st.markdown('</div>', unsafe_allow_html=True)
-            
-            with col4:
-                avg_availability = availability_data['stats']['mean']
-                st.markdown('<div class="metric-card">', unsafe_allow_html=True)
-                st.metric("Avg Availability", f"{avg_availability:.0f} days")
-                st.markdown('</div>', unsafe_allow_html=True)
+            avg_availability = availability_data['stats']['mean']
+            render_metric_row([
+                ("Total Listings", f"{availability_data['total_listings']:,}"),
+                ("High Availability", f"{availability_data['high_availability_count']:,}"),
+                ("Low Availability", f"{availability_data['low_availability_count']:,}"),
+                ("Avg Availability", f"{avg_availability:.0f} days")
+            ])
             
             # Availability distribution
             st.markdown("#### 📈 Availability Distribution")
@@ -872,13 +705,11 @@ def render_calendar_analysis_page(calendar_df, listings_df, city_data_loaded):
         st.error("❌ Copenhagen market data not available. Please ensure the data files are in the project directory.")
         return
     
-    st.markdown("### 📅 Calendar Analysis")
-    st.markdown("Analyze availability patterns and booking trends across the market.")
+    st.markdown("### 📅 Calendar Analysis\n\nAnalyze availability patterns and booking trends across the market.")
     
     # Individual Listing Calendar Analysis
     if calendar_df is not None and 'listing_id' in calendar_df.columns:
-        st.markdown("### 🏠 Individual Listing Calendar Analysis")
-        st.markdown("Select a specific listing to view its detailed calendar and availability patterns.")
+        st.markdown("### 🏠 Individual Listing Calendar Analysis\n\nSelect a specific listing to view its detailed calendar and availability patterns.")
         
         with st.spinner("Loading listing data..."):
             # Get unique listings for dropdown from the sample data
@@ -886,11 +717,11 @@ def render_calendar_analysis_page(calendar_df, listings_df, city_data_loaded):
         
         # Create a mapping of listing IDs to display names
         if listings_df is not None and 'id' in listings_df.columns and 'name' in listings_df.columns:
-            # Create a mapping from listing ID to name
-            listing_names = {}
-            for _, row in listings_df.iterrows():
-                if pd.notna(row['id']) and pd.notna(row['name']):
-                    listing_names[row['id']] = f"{row['name'][:50]}..." if len(str(row['name'])) > 50 else str(row['name'])
+            # Create a mapping from listing ID to name (vectorized truncation of long names)
+            named_listings = listings_df[['id', 'name']].dropna()
+            names = named_listings['name'].astype(str)
+            names = names.where(names.str.len() <= 50, names.str[:50] + '...')
+            listing_names = dict(zip(named_listings['id'], names))
             
             # Create dropdown options
             dropdown_options = []
@@ -927,15 +758,15 @@ def render_calendar_analysis_page(calendar_df, listings_df, city_data_loaded):
             # Create listing-specific calendar analysis
             if selected_listing_id is not None:
                 # Load full calendar data for detailed analysis
-                from utils.data_loader import load_full_calendar_data
                 full_calendar_df = load_full_calendar_data()
                 
+                # Boolean-index the listing's rows; create_calendar_events takes its own copy before adding columns
                 if full_calendar_df is not None:
                     # Filter calendar data for selected listing
-                    listing_calendar = full_calendar_df[full_calendar_df['listing_id'] == selected_listing_id].copy()
+                    listing_calendar = full_calendar_df[full_calendar_df['listing_id'] == selected_listing_id]
                 else:
                     # Fallback to sample data
-                    listing_calendar = calendar_df[calendar_df['listing_id'] == selected_listing_id].copy()
+                    listing_calendar = calendar_df[calendar_df['listing_id'] == selected_listing_id]
                 
                 if not listing_calendar.empty:
                     # Get listing details
@@ -945,23 +776,13 @@ def render_calendar_analysis_page(calendar_df, listings_df, city_data_loaded):
                         listing_detail = listing_details.iloc[0]
                         
                         # Display listing info
-                        col1, col2, col3 = st.columns(3)
-                        with col1:
-                            st.metric("Listing ID", selected_listing_id)
-                        with col2:
-                            if 'neighbourhood' in listing_detail:
-                                st.metric("Neighbourhood", listing_detail['neighbourhood'])
-                            else:
-                                st.metric("Neighbourhood", "N/A")
-                        with col3:
-                            if 'room_type' in listing_detail:
-                                st.metric("Room Type", listing_detail['room_type'])
-                            else:
-                                st.metric("Room Type", "N/A")
+                        render_metric_row([
+                            ("Listing ID", selected_listing_id),
+                            ("Neighbourhood", listing_detail['neighbourhood'] if 'neighbourhood' in listing_detail else "N/A"),
+                            ("Room Type", listing_detail['room_type'] if 'room_type' in listing_detail else "N/A")
+                        ])
                     
                     # Create listing-specific calendar visualizations
-                    from analytics.analysis import create_calendar_events
-                    
                     with st.spinner("Generating calendar events..."):
                         # Create calendar events for this listing only
                         listing_events = create_calendar_events(listing_calendar, selected_listing_id, max_events=500)
@@ -992,30 +813,19 @@ def render_calendar_analysis_page(calendar_df, listings_df, city_data_loaded):
                         )
                         
                         # Calendar statistics
-                        available_days = sum(1 for event in listing_events if event.get('extendedProps', {}).get('available', False))
-                        booked_days = sum(1 for event in listing_events if not event.get('extendedProps', {}).get('available', True))
-                        avg_price = sum(event.get('extendedProps', {}).get('price', 0) or 0 for event in listing_events) / len(listing_events) if listing_events else 0
+                        available_days, booked_days, avg_price = summarize_calendar_events(listing_events)
                         
-                        col1, col2, col3 = st.columns(3)
-                        
-                        with col1:
-                            st.metric("Available Days", available_days)
-                        
-                        with col2:
-                            st.metric("Booked Days", booked_days)
-                        
-                        with col3:
-                            if avg_price > 0:
-                                st.metric("Avg Price", f"${avg_price:.0f}")
-                            else:
-                                st.metric("Avg Price", "N/A")
+                        render_metric_row([
+                            ("Available Days", available_days),
+                            ("Booked Days", booked_days),
+                            ("Avg Price", f"${avg_price:.0f}" if avg_price > 0 else "N/A")
+                        ])
                 else:
                     st.warning(f"No calendar data found for listing {selected_listing_id}")
             
             # Calendar Analysis (Market Overview) - Only show if not viewing individual listing
             if selected_listing_id is None:
-                st.markdown("### 📅 Market Calendar Analysis")
-                st.markdown("*This shows the overall market calendar patterns across all listings.*")
+                st.markdown("### 📅 Market Calendar Analysis\n\n*This shows the overall market calendar patterns across all listings.*")
                 
                 # Analyze city market for calendar data
                 city_stats = analyze_city_market(listings_df, calendar_df)
@@ -1023,43 +833,25 @@ def render_calendar_analysis_page(calendar_df, listings_df, city_data_loaded):
                 if city_stats and city_stats['calendar_analysis'] and 'basic_stats' in city_stats['calendar_analysis']:
                     # Basic calendar stats
                     basic_stats = city_stats['calendar_analysis']['basic_stats']
-                    col1, col2, col3, col4 = st.columns(4)
-                    
-                    with col1:
-                        st.markdown('<div class="metric-card">', unsafe_allow_html=True)
-                        st.metric("Total Days", f"{basic_stats['total_days']:,}")
-                        st.markdown('</div>', unsafe_allow_html=True)
-                    
-                    with col2:
-                        st.markdown('<div class="metric-card">', unsafe_allow_html=True)
-                        st.metric("Available Days", f"{basic_stats['available_days']:,}")
-                        st.markdown('</div>', unsafe_allow_html=True)
-                    
-                    with col3:
-                        st.markdown('<div class="metric-card">', unsafe_allow_html=True)
-                        st.metric("Booked Days", f"{basic_stats['booked_days']:,}")
-                        st.markdown('</div>', unsafe_allow_html=True)
-                    
-                    with col4:
-                        st.markdown('<div class="metric-card">', unsafe_allow_html=True)
-                        st.metric("Availability Rate", f"{basic_stats['availability_rate']:.1f}%")
-                        st.markdown('</div>', unsafe_allow_html=True)
+                    render_metric_row([
+                        ("Total Days", f"{basic_stats['total_days']:,}"),
+                        ("Available Days", f"{basic_stats['available_days']:,}"),
+                        ("Booked Days", f"{basic_stats['booked_days']:,}"),
+                        ("Availability Rate", f"{basic_stats['availability_rate']:.1f}%")
+                    ])
                 
                 # Market calendar view
                 st.markdown("#### 📅 Market Calendar")
                 
                 with st.spinner("Generating market calendar events..."):
                     # Load full calendar data for market overview
-                    from utils.data_loader import load_full_calendar_data
                     full_calendar_df = load_full_calendar_data()
                     
                     if full_calendar_df is not None:
                         # Create market-wide calendar events on-demand
-                        from analytics.analysis import create_calendar_events
                         market_events = create_calendar_events(full_calendar_df, None, max_events=1000)
                     else:
                         # Fallback to sample data
-                        from analytics.analysis import create_calendar_events
                         market_events = create_calendar_events(calendar_df, None, max_events=1000)
                 
                 if market_events:
@@ -1085,23 +877,13 @@ def render_calendar_analysis_page(calendar_df, listings_df, city_data_loaded):
                     )
                     
                     # Calendar statistics
-                    available_days = sum(1 for event in market_events if event.get('extendedProps', {}).get('available', False))
-                    booked_days = sum(1 for event in market_events if not event.get('extendedProps', {}).get('available', True))
-                    avg_price = sum(event.get('extendedProps', {}).get('price', 0) or 0 for event in market_events) / len(market_events) if market_events else 0
-                    
-                    col1, col2, col3 = st.columns(3)
-                    
-                    with col1:
-                        st.metric("Available Days", available_days)
-                    
-                    with col2:
-                        st.metric("Booked Days", booked_days)
+                    available_days, booked_days, avg_price = summarize_calendar_events(market_events)
                     
-                    with col3:
-                        if avg_price > 0:
-                            st.metric("Avg Price", f"${avg_price:.0f}")
-                        else:
-                            st.metric("Avg Price", "N/A")
+                    render_metric_row([
+                        ("Available Days", available_days),
+                        ("Booked Days", booked_days),
+                        ("Avg Price", f"${avg_price:.0f}" if avg_price > 0 else "N/A")
+                    ])
 
 def main():
     # Header
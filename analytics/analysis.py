@@ -7,10 +7,23 @@ import pandas as pd
 import numpy as np
 import plotly.express as px
 import plotly.graph_objects as go
+import streamlit as st
 from utils.data_loader import clean_price_data
 import calendar
 
+# Lookup table indexed by Series.dt.dayofweek (Monday=0)
+DAY_NAMES = np.array(['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday'])
 
+
+def day_name_categorical(dates):
+    """Day names of a datetime Series as a Monday-first categorical built from integer codes"""
+    # Missing dates map to code -1, which Categorical treats as NaN
+    codes = dates.dt.dayofweek.fillna(-1).to_numpy(dtype=np.int8)
+    return pd.Series(pd.Categorical.from_codes(codes, categories=DAY_NAMES), index=dates.index)
+
+# Cached so the date parsing and calendar field extraction run once per upload,
+# not on every widget interaction
+@st.cache_data
 def analyze_occupancy(df, date_cols):
     """Analyze occupancy patterns"""
     if not date_cols:
@@ -23,7 +36,7 @@ def analyze_occupancy(df, date_cols):
     df['date'] = pd.to_datetime(df[date_col])
     df['month'] = df['date'].dt.month
     df['year'] = df['date'].dt.year
-    df['day_of_week'] = df['date'].dt.day_name()
+    df['day_of_week'] = day_name_categorical(df['date'])
 
     # Calculate occupancy metrics
     total_bookings = len(df)
@@ -34,9 +47,7 @@ def analyze_occupancy(df, date_cols):
     monthly_occupancy['date'] = pd.to_datetime(monthly_occupancy[['year', 'month']].assign(day=1))
 
     # Day of week occupancy
-    dow_occupancy = df['day_of_week'].value_counts().reindex([
-        'Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday'
-    ])
+    dow_occupancy = df['day_of_week'].value_counts(sort=False)
 
     return {
         'total_bookings': total_bookings,
@@ -73,9 +84,10 @@ def analyze_pricing(df, price_cols, date_cols):
     price_col = price_cols[0]
     date_col = date_cols[0]
     
-    # Calculate pricing metrics
-    avg_price = df[price_col].mean()
-    median_price = df[price_col].median()
+    # Calculate pricing metrics on the non-null prices as a plain NumPy array
+    prices = df[price_col].dropna().to_numpy(dtype=np.float64)
+    avg_price = prices.mean() if len(prices) > 0 else np.nan
+    median_price = np.median(prices) if len(prices) > 0 else np.nan
     price_trend = df.groupby([df['date'].dt.year, df['date'].dt.month])[price_col].mean().reset_index()
     price_trend['date'] = pd.to_datetime(price_trend[['year', 'month']].assign(day=1))
     
@@ -85,15 +97,22 @@ def analyze_pricing(df, price_cols, date_cols):
         'price_trend': price_trend
     }
 
+# Cached so the neighbourhood/room type aggregates are computed once and shared
+# across reruns and between the market insights and calendar pages
+@st.cache_data
 def analyze_city_market(listings_df, calendar_df):
     """Analyze city market statistics with comprehensive calendar analysis"""
     if listings_df is None:
         return None
     
-    # Clean price data
-    price_cols = [col for col in listings_df.columns if 'price' in col.lower()]
-    if price_cols:
-        listings_df = clean_price_data(listings_df, price_cols[0])
+    # Clean price data - the price column is resolved once at load time, scan only for frames loaded elsewhere
+    if 'price_col' in listings_df.attrs:
+        price_col = listings_df.attrs['price_col']
+    else:
+        price_cols = [col for col in listings_df.columns if 'price' in col.lower()]
+        price_col = price_cols[0] if price_cols else None
+    if price_col and f'{price_col}_clean' not in listings_df.columns:
+        listings_df = clean_price_data(listings_df, price_col)
     
     # Basic market stats
     total_listings = len(listings_df)
@@ -102,42 +121,52 @@ def analyze_city_market(listings_df, calendar_df):
     
     # Price analysis
     price_stats = {}
-    if price_cols and f'{price_cols[0]}_clean' in listings_df.columns:
-        price_data = listings_df[f'{price_cols[0]}_clean'].dropna()
-        if len(price_data) > 0:
+    if price_col and f'{price_col}_clean' in listings_df.columns:
+        # Extract the non-null prices once - every statistic below reduces the same NumPy array
+        prices = listings_df[f'{price_col}_clean'].dropna().to_numpy(dtype=np.float64)
+        if len(prices) > 0:
+            # Min, median and max from a single quantile pass over the raw array
+            min_price, median_price, max_price = np.quantile(prices, [0, 0.5, 1])
             price_stats = {
-                'avg_price': price_data.mean(),
-                'median_price': price_data.median(),
-                'min_price': price_data.min(),
-                'max_price': price_data.max(),
-                'price_distribution': price_data
+                'avg_price': prices.mean(),
+                'median_price': median_price,
+                'min_price': min_price,
+                'max_price': max_price,
+                # Pre-binned so charts only ship 30 bars instead of every listing price
+                'price_histogram': np.histogram(prices, bins=30)
             }
     
     # Neighbourhood analysis
     neighbourhood_stats = {}
-    if 'neighbourhood' in listings_df.columns and price_cols:
-        neighbourhood_stats = listings_df.groupby('neighbourhood').agg({
-            'id': 'count',
-            f'{price_cols[0]}_clean': ['mean', 'median', 'count']
-        }).round(2)
-        neighbourhood_stats.columns = ['listings', 'avg_price', 'median_price', 'price_count']
+    if 'neighbourhood' in listings_df.columns and price_col:
+        # Named aggregation - row counts and price stats in one pass, no column renaming afterwards
+        neighbourhood_stats = listings_df.groupby('neighbourhood', observed=True).agg(
+            listings=('neighbourhood', 'size'),
+            avg_price=(f'{price_col}_clean', 'mean'),
+            median_price=(f'{price_col}_clean', 'median'),
+            price_count=(f'{price_col}_clean', 'count')
+        ).round(2)
     
     # Room type analysis
     room_type_stats = {}
-    if 'room_type' in listings_df.columns and price_cols:
-        room_type_stats = listings_df.groupby('room_type').agg({
-            'id': 'count',
-            f'{price_cols[0]}_clean': ['mean', 'median', 'count']
-        }).round(2)
-        room_type_stats.columns = ['listings', 'avg_price', 'median_price', 'price_count']
+    if 'room_type' in listings_df.columns and price_col:
+        # Named aggregation - row counts and price stats in one pass, no column renaming afterwards
+        room_type_stats = listings_df.groupby('room_type', observed=True).agg(
+            listings=('room_type', 'size'),
+            avg_price=(f'{price_col}_clean', 'mean'),
+            median_price=(f'{price_col}_clean', 'median'),
+            price_count=(f'{price_col}_clean', 'count')
+        ).round(2)
     
     # Enhanced Calendar Analysis - Only basic stats for performance
     calendar_analysis = {}
     if calendar_df is not None and 'available' in calendar_df.columns:
         # Only do basic stats for performance - detailed analysis will be done on-demand
         total_days = len(calendar_df)
-        available_days = (calendar_df['available'] == 't').sum()
-        booked_days = (calendar_df['available'] == 'f').sum()
+        # One hashed pass over the flags instead of a string comparison per status
+        availability_counts = calendar_df['available'].value_counts()
+        available_days = availability_counts.get('t', 0)
+        booked_days = availability_counts.get('f', 0)
         availability_rate = (available_days / total_days) * 100 if total_days > 0 else 0
         occupancy_rate = (booked_days / total_days) * 100 if total_days > 0 else 0
         
@@ -164,62 +193,70 @@ def analyze_city_market(listings_df, calendar_df):
         'calendar_analysis': calendar_analysis
     }
 
-def analyze_copenhagen_occupancy(calendar_df, listings_df=None):
-    """Analyze occupancy patterns for Copenhagen market using calendar data and listings availability"""
-    if calendar_df is None or calendar_df.empty:
+def analyze_copenhagen_occupancy(daily_counts, listings_df=None):
+    """Analyze occupancy patterns for Copenhagen market using daily calendar counts and listings availability"""
+    if daily_counts is None or daily_counts.empty:
         return None
     
-    # Ensure date column is datetime
-    if 'date' in calendar_df.columns:
-        calendar_df['date'] = pd.to_datetime(calendar_df['date'])
-    
-    # Add day of week and month information
-    calendar_df['day_of_week'] = calendar_df['date'].dt.day_name()
-    calendar_df['month'] = calendar_df['date'].dt.month
-    calendar_df['year'] = calendar_df['date'].dt.year
-    calendar_df['day_of_month'] = calendar_df['date'].dt.day
+    # All breakdowns work on the per-date counts (one row per calendar date) instead of every listing-day
+    dates = pd.DatetimeIndex(daily_counts.index)
     
     # Calculate occupancy metrics
-    total_days = len(calendar_df)
-    booked_days = (calendar_df['available'] == 'f').sum()
-    available_days = (calendar_df['available'] == 't').sum()
+    total_days = daily_counts['total_days'].sum()
+    booked_days = daily_counts['booked_days'].sum()
+    available_days = daily_counts['available_days'].sum()
     
     # Overall occupancy rate
     occupancy_rate = (booked_days / total_days) * 100 if total_days > 0 else 0
     
+    # Only dates with at least one booking contribute a group below
+    has_bookings = (daily_counts['booked_days'] > 0).to_numpy()
+    booked_by_date = daily_counts['booked_days'][has_bookings]
+    booked_dates = dates[has_bookings]
+    
+    # Day of week and day of month have fixed key ranges - sum the bookings straight into those slots.
+    # Slots no calendar date falls on (e.g. the 31st in a short window) have no data rather than
+    # zero bookings, so they stay NaN
+    bookings = booked_by_date.to_numpy()
+    
+    def slot_bookings(date_slots, booked_slots, n_slots):
+        covered = np.bincount(date_slots, minlength=n_slots) > 0
+        return np.where(covered, np.bincount(booked_slots, weights=bookings, minlength=n_slots), np.nan)
+    
     # Occupancy by day of week
-    dow_occupancy = calendar_df[calendar_df['available'] == 'f'].groupby('day_of_week').size()
-    dow_occupancy = dow_occupancy.reindex([
-        'Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday'
-    ]).fillna(0)
+    dow_occupancy = pd.Series(
+        slot_bookings(dates.dayofweek, booked_dates.dayofweek, 7),
+        index=pd.Index(DAY_NAMES, name='day_of_week')
+    )
     
     # Occupancy by month
-    monthly_occupancy = calendar_df[calendar_df['available'] == 'f'].groupby(['year', 'month']).size().reset_index(name='booked_days')
+    monthly_occupancy = booked_by_date.groupby([booked_dates.year.rename('year'), booked_dates.month.rename('month')]).sum().reset_index(name='booked_days')
     monthly_occupancy['date'] = pd.to_datetime(monthly_occupancy[['year', 'month']].assign(day=1))
     
     # Occupancy by day of month (1-31)
-    day_of_month_occupancy = calendar_df[calendar_df['available'] == 'f'].groupby('day_of_month').size()
-    day_of_month_occupancy = day_of_month_occupancy.reindex(range(1, 32)).fillna(0)
+    day_of_month_occupancy = pd.Series(
+        slot_bookings(dates.day, booked_dates.day, 32)[1:],
+        index=pd.RangeIndex(1, 32, name='day_of_month')
+    )
     
-    # Peak and low occupancy days
-    peak_day = dow_occupancy.idxmax() if not dow_occupancy.empty else None
-    peak_bookings = dow_occupancy.max() if not dow_occupancy.empty else 0
-    low_day = dow_occupancy.idxmin() if not dow_occupancy.empty else None
-    low_bookings = dow_occupancy.min() if not dow_occupancy.empty else 0
+    # Peak and low occupancy days - one argmax/argmin each over the days with data, then positional lookups
+    dow_values = dow_occupancy.to_numpy()
+    peak_pos, low_pos = np.nanargmax(dow_values), np.nanargmin(dow_values)
+    peak_day, peak_bookings = dow_occupancy.index[peak_pos], dow_values[peak_pos].astype(bookings.dtype)
+    low_day, low_bookings = dow_occupancy.index[low_pos], dow_values[low_pos].astype(bookings.dtype)
     
     # Weekend vs weekday analysis
     weekend_days = ['Saturday', 'Sunday']
     weekday_days = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday']
     
-    weekend_bookings = dow_occupancy[weekend_days].sum()
-    weekday_bookings = dow_occupancy[weekday_days].sum()
+    weekend_bookings = dow_occupancy[weekend_days].sum().astype(bookings.dtype)
+    weekday_bookings = dow_occupancy[weekday_days].sum().astype(bookings.dtype)
     
     weekend_pct = (weekend_bookings / booked_days * 100) if booked_days > 0 else 0
     weekday_pct = (weekday_bookings / booked_days * 100) if booked_days > 0 else 0
     
     # Seasonal analysis (quarters)
-    calendar_df['quarter'] = calendar_df['date'].dt.quarter
-    quarterly_occupancy = calendar_df[calendar_df['available'] == 'f'].groupby(['year', 'quarter']).size().reset_index(name='booked_days')
+    quarterly_occupancy = booked_by_date.groupby([booked_dates.year.rename('year'), booked_dates.quarter.rename('quarter')]).sum().reset_index(name='booked_days')
     
     # Enhanced analysis with availability_365 from listings data
     availability_analysis = {}
@@ -237,11 +274,11 @@ def analyze_copenhagen_occupancy(calendar_df, listings_df=None):
         
         # Availability by room type
         if 'room_type' in listings_df.columns:
-            availability_by_room = listings_df.groupby('room_type')['availability_365'].agg(['mean', 'median', 'count'])
+            availability_by_room = listings_df.groupby('room_type', observed=True)['availability_365'].agg(['mean', 'median', 'count'])
         
         # Availability by neighbourhood
         if 'neighbourhood' in listings_df.columns:
-            availability_by_neighbourhood = listings_df.groupby('neighbourhood')['availability_365'].agg(['mean', 'median', 'count'])
+            availability_by_neighbourhood = listings_df.groupby('neighbourhood', observed=True)['availability_365'].agg(['mean', 'median', 'count'])
             # Get top 10 neighbourhoods by average availability
             top_neighbourhoods_availability = availability_by_neighbourhood.sort_values('mean', ascending=False).head(10)
         
@@ -310,11 +347,10 @@ def create_calendar_events(calendar_df, listing_id=None, max_events=1000):
     
     # Filter by listing_id if provided
     if listing_id is not None:
-        calendar_df = calendar_df[calendar_df['listing_id'] == listing_id].copy()
+        calendar_df = calendar_df[calendar_df['listing_id'] == listing_id]
     
-    # Limit the number of events for performance
-    if len(calendar_df) > max_events:
-        calendar_df = calendar_df.head(max_events)
+    # Limit the number of events for performance - only these rows are copied to add columns to
+    calendar_df = calendar_df.head(max_events).copy()
     
     # Convert date column to datetime if not already
     if 'date' in calendar_df.columns:
@@ -323,48 +359,64 @@ def create_calendar_events(calendar_df, listing_id=None, max_events=1000):
     # Clean price data if price column exists - do this vectorized
     if 'price' in calendar_df.columns:
         calendar_df['price_clean'] = pd.to_numeric(
-            calendar_df['price'].str.replace('$', '').str.replace(',', ''), 
+            calendar_df['price'].str.lstrip('$').str.replace(',', '', regex=False),
             errors='coerce'
         )
     
-    # Vectorized event creation for better performance
+    # Vectorized event creation - build every per-event field column-wise, then zip them together
     events = []
+    n_events = len(calendar_df)
+    
+    def column_values(col, default):
+        return calendar_df[col].tolist() if col in calendar_df.columns else [default] * n_events
     
     # Create availability masks
     available_mask = calendar_df['available'] == 't'
     
-    # Create events using vectorized operations
-    for idx, (_, row) in enumerate(calendar_df.iterrows()):
-        if idx >= max_events:  # Safety check
-            break
-            
-        # Determine event color based on availability
-        if row['available'] == 't':
-            color = "#28a745"  # Green for available
-            price_display = row.get('price_clean', row.get('price', 'N/A'))
-            title = f"Available - ${price_display}"
-        else:
-            color = "#dc3545"  # Red for booked
-            price_display = row.get('price_clean', row.get('price', 'N/A'))
-            title = f"Booked - ${price_display}"
+    # Prefer the cleaned price, fall back to the raw one
+    price_col = 'price_clean' if 'price_clean' in calendar_df.columns else 'price'
+    prices = column_values(price_col, None)
+    price_labels = prices if price_col in calendar_df.columns else ['N/A'] * n_events
+    
+    dates = calendar_df['date'].dt.strftime('%Y-%m-%d').tolist()
+    listing_ids = [str(listing) for listing in column_values('listing_id', '')]
+    minimum_nights = column_values('minimum_nights', None)
+    maximum_nights = column_values('maximum_nights', None)
+    
+    for is_available, date, listing, price, price_label, min_nights, max_nights in zip(
+            available_mask.tolist(), dates, listing_ids, prices, price_labels, minimum_nights, maximum_nights):
+        # Green for available, red for booked
+        status, color = ("Available", "#28a745") if is_available else ("Booked", "#dc3545")
         
-        event = {
-            "title": title,
-            "start": row['date'].strftime('%Y-%m-%d'),
-            "end": row['date'].strftime('%Y-%m-%d'),
+        events.append({
+            "title": f"{status} - ${price_label}",
+            "start": date,
+            "end": date,
             "color": color,
-            "resourceId": str(row.get('listing_id', '')),
+            "resourceId": listing,
             "extendedProps": {
-                "available": row['available'] == 't',
-                "price": row.get('price_clean', row.get('price', None)),
-                "minimum_nights": row.get('minimum_nights', None),
-                "maximum_nights": row.get('maximum_nights', None)
+                "available": is_available,
+                "price": price,
+                "minimum_nights": min_nights,
+                "maximum_nights": max_nights
             }
-        }
-        events.append(event)
+        })
     
     return events
 
+def summarize_calendar_events(events):
+    """Count available/booked days and average the event prices in one pass over the events"""
+    if not events:
+        return 0, 0, 0
+    
+    # Pull the flags and prices into arrays once, then reduce with NumPy instead of repeated generator sums
+    props = [event.get('extendedProps', {}) for event in events]
+    available = np.fromiter((prop.get('available', False) for prop in props), dtype=bool, count=len(props))
+    prices = np.fromiter((prop.get('price', 0) or 0 for prop in props), dtype=float, count=len(props))
+    
+    available_days = int(available.sum())
+    return available_days, len(props) - available_days, prices.mean()
+
 def analyze_review_patterns(reviews_df):
     """Analyze review patterns by day of the week"""
     if reviews_df is None or reviews_df.empty:
@@ -373,12 +425,10 @@ def analyze_review_patterns(reviews_df):
     # Convert date column to datetime
     if 'date' in reviews_df.columns:
         reviews_df['date'] = pd.to_datetime(reviews_df['date'])
-        reviews_df['day_of_week'] = reviews_df['date'].dt.day_name()
+        reviews_df['day_of_week'] = day_name_categorical(reviews_df['date'])
         
-        # Count reviews by day of week
-        reviews_by_day = reviews_df['day_of_week'].value_counts().reindex([
-            'Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday'
-        ])
+        # Count reviews by day of week - categorical counts already come in Monday-first order
+        reviews_by_day = reviews_df['day_of_week'].value_counts(sort=False)
         
         # Calculate percentages
         total_reviews = len(reviews_df)
@@ -419,12 +469,14 @@ def analyze_enhanced_review_patterns(reviews_df, listings_df):
                 if feature in listings_df.columns:
                     feature_data = listings_df[feature].dropna()
                     if len(feature_data) > 0:
+                        values = feature_data.to_numpy()
+                        min_value, median_value, max_value = np.quantile(values, [0, 0.5, 1])
                         review_stats[feature] = {
-                            'mean': feature_data.mean(),
-                            'median': feature_data.median(),
-                            'std': feature_data.std(),
-                            'min': feature_data.min(),
-                            'max': feature_data.max(),
+                            'mean': values.mean(),
+                            'median': median_value,
+                            'std': values.std(ddof=1),
+                            'min': min_value,
+                            'max': max_value,
                             'total_listings': len(feature_data),
                             'zero_reviews': (feature_data == 0).sum(),
                             'zero_reviews_pct': ((feature_data == 0).sum() / len(feature_data) * 100).round(1)
@@ -449,9 +501,9 @@ def analyze_enhanced_review_patterns(reviews_df, listings_df):
                             bins = [0, 1, 5, 10, 25, 50, 100, float('inf')]
                             labels = ['0', '1-5', '6-10', '11-25', '26-50', '51-100', '100+']
                         
-                        # Create distribution
+                        # Create distribution - pd.cut buckets via searchsorted, and categorical counts come back in bin order
                         distribution = pd.cut(feature_data, bins=bins, labels=labels, include_lowest=True)
-                        review_distributions[feature] = distribution.value_counts().sort_index()
+                        review_distributions[feature] = distribution.value_counts(sort=False)
             
             enhanced_data['review_distributions'] = review_distributions
             
@@ -460,30 +512,24 @@ def analyze_enhanced_review_patterns(reviews_df, listings_df):
                 correlation_data = listings_df[available_features].corr()
                 enhanced_data['review_correlations'] = correlation_data
             
-            # Analysis by room type
+            # Analysis by room type - aggregate every review feature in a single groupby pass
             if 'room_type' in listings_df.columns:
-                room_type_reviews = {}
-                for feature in available_features:
-                    if feature in listings_df.columns:
-                        room_type_stats = listings_df.groupby('room_type')[feature].agg([
-                            'mean', 'median', 'count', 'std'
-                        ]).round(2)
-                        room_type_reviews[feature] = room_type_stats
-                
-                enhanced_data['room_type_reviews'] = room_type_reviews
+                room_type_stats = listings_df.groupby('room_type', observed=True)[available_features].agg([
+                    'mean', 'median', 'count', 'std'
+                ]).round(2)
+                enhanced_data['room_type_reviews'] = {
+                    feature: room_type_stats[feature] for feature in available_features
+                }
             
             # Analysis by neighbourhood
             if 'neighbourhood' in listings_df.columns:
-                neighbourhood_reviews = {}
-                for feature in available_features:
-                    if feature in listings_df.columns:
-                        # Get top 10 neighbourhoods by number of listings
-                        top_neighbourhoods = listings_df['neighbourhood'].value_counts().head(10).index
-                        neighbourhood_stats = listings_df[listings_df['neighbourhood'].isin(top_neighbourhoods)].groupby('neighbourhood')[feature].agg([
-                            'mean', 'median', 'count', 'std'
-                        ]).round(2)
-                        neighbourhood_reviews[feature] = neighbourhood_stats
-                
-                enhanced_data['neighbourhood_reviews'] = neighbourhood_reviews
+                # Get top 10 neighbourhoods by number of listings
+                top_neighbourhoods = listings_df['neighbourhood'].value_counts().head(10).index
+                neighbourhood_stats = listings_df[listings_df['neighbourhood'].isin(top_neighbourhoods)].groupby('neighbourhood', observed=True)[available_features].agg([
+                    'mean', 'median', 'count', 'std'
+                ]).round(2)
+                enhanced_data['neighbourhood_reviews'] = {
+                    feature: neighbourhood_stats[feature] for feature in available_features
+                }
     
     return enhanced_data
\ No newline at end of file
@@ -4,6 +4,7 @@ UI components and styling for Airbnb Host Dashboard
 """
 
 import streamlit as st
+import plotly.express as px
 
 def get_custom_css():
     """Return custom CSS styling"""
@@ -17,7 +18,7 @@ def get_custom_css():
             font-weight: 700;
         }
         
-        .metric-card {
+        .metric-card, [data-testid="stMetric"] {
             background: linear-gradient(135deg, #ffffff 0%, #f8f9fa 100%);
             padding: 1.5rem;
             border-radius: 12px;
@@ -55,6 +56,23 @@ def get_custom_css():
     </style>
     """
 
+@st.cache_data
+def build_viridis_bar_chart(series, title, x_label, y_label):
+    """Build a viridis-coloured bar chart of a Series (index on the x axis), cached across reruns"""
+    return px.bar(
+        x=series.index,
+        y=series.values,
+        title=title,
+        labels={'x': x_label, 'y': y_label},
+        color=series.values,
+        color_continuous_scale='viridis'
+    )
+
+def render_metric_row(metrics):
+    """Render (label, value) metrics side by side, one column each"""
+    for col, (label, value) in zip(st.columns(len(metrics)), metrics):
+        col.metric(label, value)
+
 def render_metric_card(label, value, icon=""):
     """Render a metric card with consistent styling"""
     st.markdown(f"""
@@ -3,10 +3,86 @@
 Data loading and cleaning utilities for Airbnb Host Dashboard
 """
 
+import os
+import hashlib
+import uuid
 import pandas as pd
-import numpy as np
 from pathlib import Path
 import streamlit as st
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+
+# Arrow-backed text dtype with NaN for missing values - string kernels run over UTF-8 buffers instead
+# of Python objects. This is pandas 3's default str dtype; pandas 2.1/2.2 call it 'pyarrow_numpy' and
+# older versions keep object columns
+try:
+    ARROW_STRING_DTYPE = pd.StringDtype('pyarrow', na_value=float('nan'))
+except TypeError:
+    try:
+        ARROW_STRING_DTYPE = pd.StringDtype('pyarrow_numpy')
+    except ValueError:
+        ARROW_STRING_DTYPE = None
+
+def use_arrow_strings(df):
+    """Store the text columns of a freshly read frame as Arrow-backed strings"""
+    if ARROW_STRING_DTYPE is None:
+        return df
+    for col in df.select_dtypes(include='object').columns:
+        # Object columns can also hold parsed dates - only convert the ones holding text
+        if pd.api.types.infer_dtype(df[col], skipna=True) == 'string':
+            df[col] = df[col].astype(ARROW_STRING_DTYPE)
+    return df
+
+# Listing columns the analyses use - the detailed export carries ~80, mostly long free text
+LISTINGS_COLUMNS = ['id', 'name', 'neighbourhood', 'room_type', 'price', 'availability_365',
+                    'number_of_reviews', 'reviews_per_month', 'number_of_reviews_ltm']
+
+# Part of every sidecar key - bump when a reader's output changes so existing copies are re-parsed
+SIDECAR_VERSION = 2
+
+def read_csv_arrow(csv_path, usecols=None):
+    """Parse a CSV with pyarrow's multithreaded reader, allowing quoted newlines in free-text fields"""
+    # Empty text fields are missing values, as with pd.read_csv
+    convert_options = pa_csv.ConvertOptions(strings_can_be_null=True)
+    if usecols:
+        # Only the requested columns are converted; ones missing from the file come back all-null
+        convert_options.include_columns = usecols
+        convert_options.include_missing_columns = True
+    table = pa_csv.read_csv(csv_path, parse_options=pa_csv.ParseOptions(newlines_in_values=True),
+                            convert_options=convert_options)
+    return table.to_pandas()
+
+def read_csv_cached(csv_path, reader=pd.read_csv, **read_kwargs):
+    """Read a CSV file, reusing a Parquet copy written beside it after the first parse"""
+    csv_path = Path(csv_path)
+    # Key the copy on the reader and its arguments - a different parser or column projection
+    # must never be served a copy written by another
+    read_args = (SIDECAR_VERSION, reader.__module__, reader.__qualname__, sorted(read_kwargs.items()))
+    read_key = hashlib.sha1(repr(read_args).encode()).hexdigest()[:12]
+    parquet_path = csv_path.with_name(f'{csv_path.name}.{read_key}.parquet')
+    
+    # Reuse the Parquet copy unless the CSV has been replaced since it was written
+    if parquet_path.exists() and parquet_path.stat().st_mtime >= csv_path.stat().st_mtime:
+        return pd.read_parquet(parquet_path)
+    
+    df = use_arrow_strings(reader(csv_path, **read_kwargs))
+    # Write to a uniquely named file beside the target and swap it in, so an interrupted write never
+    # leaves a truncated copy and concurrent sessions (threads of one process) never share a temp file
+    tmp_path = parquet_path.with_suffix(f'.{uuid.uuid4().hex}.tmp.parquet')
+    try:
+        df.to_parquet(tmp_path, compression='zstd', index=False)
+        os.replace(tmp_path, parquet_path)
+    except OSError:
+        # Read-only deployments simply keep parsing the CSV
+        tmp_path.unlink(missing_ok=True)
+    return df
+
+def downcast_integers(df):
+    """Shrink integer columns to the smallest integer dtype that holds their values"""
+    # Counts and nights fit in int8/int16 - scans and groupbys then move a fraction of the bytes
+    for col in df.select_dtypes(include='integer').columns:
+        df[col] = pd.to_numeric(df[col], downcast='integer')
+    return df
 
 @st.cache_data
 def load_booking_data(uploaded_files):
@@ -18,7 +94,7 @@ def load_booking_data(uploaded_files):
         
         for uploaded_file in uploaded_files:
             # Read the CSV file
-            df = pd.read_csv(uploaded_file)
+            df = use_arrow_strings(pd.read_csv(uploaded_file))
             
             # Standardize column names
             df.columns = df.columns.str.lower().str.replace(' ', '_')
@@ -41,7 +117,8 @@ def load_booking_data(uploaded_files):
                 # Clean price columns
                 for col in price_columns:
                     try:
-                        df[col] = pd.to_numeric(df[col].astype(str).str.replace('$', '').str.replace(',', ''), errors='coerce')
+                        # Single regex pass strips both the currency sign and thousands separators
+                        df[col] = pd.to_numeric(df[col].astype(str).str.replace(r'[\$,]', '', regex=True), errors='coerce')
                     except:
                         pass
             
@@ -68,17 +145,31 @@ def load_city_data():
     try:
         # Load listings data
         if Path('listings.csv').exists():
-            listings_df = pd.read_csv('listings.csv')
+            listings_df = read_csv_cached('listings.csv', engine='pyarrow')
         elif Path('listings.csv.gz').exists():
-            listings_df = pd.read_csv('listings.csv.gz', compression='gzip')
+            # Detailed export has multi-line free text fields - parse with quoted newlines allowed,
+            # converting only the columns the analyses use
+            listings_df = read_csv_cached('listings.csv.gz', reader=read_csv_arrow, usecols=LISTINGS_COLUMNS)
         else:
             return None, None, None
         
         # Clean listings data - remove completely NaN columns
         if listings_df is not None:
             # Remove columns that are completely NaN
-            listings_df = listings_df.dropna(axis=1, how='all')
+            listings_df = downcast_integers(listings_df.dropna(axis=1, how='all'))
             
+            # Low-cardinality text columns as categoricals - groupbys and comparisons run on integer codes
+            for col in ['neighbourhood', 'room_type']:
+                if col in listings_df.columns:
+                    listings_df[col] = listings_df[col].astype('category')
+            
+            # Resolve the price column once so analyses don't rescan the column names on every rerun
+            price_cols = [col for col in listings_df.columns if 'price' in col.lower()]
+            listings_df.attrs['price_col'] = price_cols[0] if price_cols else None
+            
+            # Clean prices once here so the analyses receive a ready numeric column
+            if listings_df.attrs['price_col']:
+                listings_df = clean_price_data(listings_df, listings_df.attrs['price_col'])
         
         # Load calendar data - only load a sample for initial stats
         if Path('calendar.csv.gz').exists():
@@ -88,21 +179,28 @@ def load_city_data():
                                     nrows=10000)  # Only load first 10k rows for initial stats
             # Clean calendar data
             if calendar_df is not None:
-                calendar_df = calendar_df.dropna(axis=1, how='all')
+                calendar_df = use_arrow_strings(downcast_integers(calendar_df.dropna(axis=1, how='all')))
                 # Convert date column for better performance
                 calendar_df['date'] = pd.to_datetime(calendar_df['date'])
+                # 't'/'f' flags as a categorical - comparisons and counts run on int8 codes
+                calendar_df['available'] = calendar_df['available'].astype('category')
         else:
             calendar_df = None
         
         
         # Load reviews data
         if Path('reviews.csv').exists():
-            reviews_df = pd.read_csv('reviews.csv')
+            reviews_df = read_csv_cached('reviews.csv', engine='pyarrow')
         elif Path('reviews.csv.gz').exists():
-            reviews_df = pd.read_csv('reviews.csv.gz', compression='gzip')
+            # Only the review dates are analyzed - skip parsing the comment text
+            reviews_df = read_csv_cached('reviews.csv.gz', reader=read_csv_arrow, usecols=['listing_id', 'date'])
         else:
             reviews_df = None
         
+        # Parse review dates once at load instead of in every review analysis
+        if reviews_df is not None and 'date' in reviews_df.columns:
+            reviews_df['date'] = pd.to_datetime(reviews_df['date'])
+        
         return listings_df, calendar_df, reviews_df
     
     except Exception as e:
@@ -115,20 +213,15 @@ def clean_price_data(df, price_col):
     if price_col not in df.columns:
         return df
     
-    def clean_price(price):
-        try:
-            if pd.isna(price):
-                return np.nan
-            elif isinstance(price, (int, float)):
-                return float(price)
-            elif isinstance(price, str):
-                return float(price.replace('$', '').replace(',', ''))
-            else:
-                return np.nan
-        except:
-            return np.nan
-    
-    df[f'{price_col}_clean'] = df[price_col].apply(clean_price)
+    # Dispatch on dtype once - numeric prices need no parsing at all
+    prices = df[price_col]
+    if pd.api.types.is_numeric_dtype(prices):
+        df[f'{price_col}_clean'] = prices.astype('float64')
+        return df
+
+    # Vectorized cleaning - strip currency formatting from text prices
+    prices = prices.astype(str).str.replace(r'[\$,]', '', regex=True)
+    df[f'{price_col}_clean'] = pd.to_numeric(prices, errors='coerce').astype('float64')
     return df
 
 @st.cache_data
@@ -136,14 +229,51 @@ def load_full_calendar_data():
     """Load the full calendar dataset for detailed analysis"""
     try:
         if Path('calendar.csv.gz').exists():
-            calendar_df = pd.read_csv('calendar.csv.gz', compression='gzip', 
-                                    usecols=['listing_id', 'date', 'available', 'price', 'minimum_nights', 'maximum_nights'])
+            # Arrow opens the .gz as a compressed stream, decompressing ahead while blocks are parsed
+            calendar_df = read_csv_cached('calendar.csv.gz', reader=read_csv_arrow,
+                                          usecols=['listing_id', 'date', 'available', 'price', 'minimum_nights', 'maximum_nights'])
             if calendar_df is not None:
-                calendar_df = calendar_df.dropna(axis=1, how='all')
+                calendar_df = downcast_integers(calendar_df.dropna(axis=1, how='all'))
                 calendar_df['date'] = pd.to_datetime(calendar_df['date'])
+                # 't'/'f' flags as a categorical - int8 codes instead of millions of string objects
+                calendar_df['available'] = calendar_df['available'].astype('category')
             return calendar_df
         else:
             return None
     except Exception as e:
         st.error(f"Error loading full calendar data: {e}")
-        return None
\ No newline at end of file
+        return None
+
+def count_calendar_days(calendar_df):
+    """Count listing-days per calendar date - total, booked ('f') and available ('t')"""
+    return pd.DataFrame({
+        'date': calendar_df['date'],
+        'total_days': 1,
+        'booked_days': calendar_df['available'] == 'f',
+        'available_days': calendar_df['available'] == 't'
+    }).groupby('date').sum()
+
+@st.cache_data
+def load_calendar_daily_counts(block_size=16 << 20):
+    """Stream the full calendar in chunks and aggregate it to per-date occupancy counts"""
+    try:
+        if Path('calendar.csv.gz').exists():
+            # Arrow's streaming reader decodes one block of listing-days at a time, converting
+            # only the two columns counted here
+            reader = pa_csv.open_csv(
+                'calendar.csv.gz',
+                read_options=pa_csv.ReadOptions(block_size=block_size),
+                convert_options=pa_csv.ConvertOptions(
+                    include_columns=['date', 'available'],
+                    column_types={'date': pa.string(), 'available': pa.string()}
+                )
+            )
+            chunk_counts = [count_calendar_days(batch.to_pandas()) for batch in reader]
+            daily_counts = pd.concat(chunk_counts).groupby(level=0).sum()
+            daily_counts.index = pd.to_datetime(daily_counts.index)
+            return daily_counts
+        else:
+            return None
+    except Exception as e:
+        st.error(f"Error loading calendar occupancy data: {e}")
+        return None